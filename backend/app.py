@@ -1,25 +1,156 @@
-from flask import Flask, request, jsonify
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt
+from flask import Flask, Blueprint, Response, request, jsonify, g
+from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt
 from flask_cors import CORS
 import bcrypt
 import json
+import queue
+import time
+from functools import wraps
 from datetime import datetime, timedelta
-import requests
 from config import Config
-from db import execute_query, execute_one
+from db import execute_query, execute_one, read_only, warmup_pool
+from cache import cache_get, cache_set, cache_delete
+from dates import retention_start
+from events import subscribe, unsubscribe, format_sse
 
-app = Flask(__name__)
-app.config['JWT_SECRET_KEY'] = Config.JWT_SECRET_KEY
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = Config.JWT_ACCESS_TOKEN_EXPIRES
+# Rotas ficam no blueprint; o app é montado em create_app()
+api = Blueprint('api', __name__)
+jwt = JWTManager()
 
-CORS(app)
-jwt = JWTManager(app)
+# Prazo (epoch) até o qual o cliente deve ler do primário após escrever.
+# Vai na resposta da escrita e o cliente reenvia, valendo em qualquer worker.
+READ_AFTER_HEADER = 'X-Read-After'
+
+def mark_write():
+    """Pede ao cliente que leia do primário por DB_STICKY_SECONDS (read-your-writes)"""
+    if Config.DB_REPLICA_HOSTS:
+        g.read_after = time.time() + Config.DB_STICKY_SECONDS
+
+def wrote_recently():
+    """Indica se o cliente escreveu há menos de DB_STICKY_SECONDS"""
+    try:
+        until = float(request.headers.get(READ_AFTER_HEADER, 0))
+    except ValueError:
+        return False
+    now = time.time()
+    # O valor vem do cliente: não aceita prazo além do máximo configurado
+    return now < until <= now + Config.DB_STICKY_SECONDS
+
+def read_only_route(fn):
+    """Marca rota GET como somente leitura (consultas podem ir para réplicas)"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with read_only(primary=wrote_recently()):
+            return fn(*args, **kwargs)
+    return wrapper
+
+@api.after_app_request
+def send_read_after(response):
+    """Devolve ao cliente o prazo de leitura no primário após escritas"""
+    read_after = g.get('read_after')
+    if read_after:
+        response.headers[READ_AFTER_HEADER] = f'{read_after:.3f}'
+    return response
+
+# ====================================================================
+# TENANT (BARBEARIA)
+# ====================================================================
+
+def get_shop(shop_id):
+    """Busca barbearia ativa por id (com cache)"""
+    key = ('shop', shop_id)
+    shop = cache_get(key)
+    if shop is None:
+        shop = execute_one(
+            'SELECT id, name, evolution_instance FROM shops WHERE id = %s AND active = true',
+            (shop_id,)
+        )
+        if not shop:
+            return None
+        cache_set(key, shop)
+    return shop
+
+def get_shop_by_instance(instance):
+    """Busca barbearia ativa pela instância Evolution (com cache)"""
+    key = ('shop_instance', instance)
+    shop = cache_get(key)
+    if shop is None:
+        shop = execute_one(
+            'SELECT id, name, evolution_instance FROM shops WHERE evolution_instance = %s AND active = true',
+            (instance,)
+        )
+        if not shop:
+            return None
+        cache_set(key, shop)
+    return shop
+
+def get_catalog(table, shop_id):
+    """Lista serviços ou barbeiros ativos da barbearia (com cache)"""
+    key = (table, shop_id)
+    items = cache_get(key)
+    if items is None:
+        # table vem sempre do código ('services' ou 'barbers'), nunca do usuário
+        items = cache_set(key, list(execute_query(
+            f'SELECT * FROM {table} WHERE shop_id = %s AND active = true ORDER BY name',
+            (shop_id,)
+        )))
+    return items
+
+def refresh_catalog(table, shop_id):
+    """Recarrega o catálogo do primário (após alteração ou id desconhecido)
+
+    Lê do primário para não guardar no cache dados de réplica atrasada. Os
+    outros workers só veem a mudança quando o cache expira
+    (CATALOG_CACHE_SECONDS, mantido curto por isso).
+    """
+    cache_delete((table, shop_id))
+    with read_only(primary=True):
+        return get_catalog(table, shop_id)
+
+def in_catalog(table, shop_id, item_id):
+    """Verifica se o item está ativo no catálogo da barbearia"""
+    if any(str(item['id']) == str(item_id) for item in get_catalog(table, shop_id)):
+        return True
+    # Cache deste worker pode ser anterior a um cadastro feito em outro worker
+    return any(str(item['id']) == str(item_id) for item in refresh_catalog(table, shop_id))
+
+def token_claims(user):
+    """Claims do JWT (admin fica restrito à sua barbearia, se tiver uma)"""
+    claims = {'role': user['role']}
+    if user['role'] == 'admin':
+        claims['shop_id'] = user.get('shop_id')
+    return claims
+
+@api.before_app_request
+def resolve_shop():
+    """Identifica a barbearia pelo header X-Shop-Id (ou ?shop_id=, usado pelo SSE)"""
+    if request.method == 'OPTIONS' or request.endpoint in ('api.health', 'api.webhook_evolution'):
+        return None
+    
+    try:
+        shop_id = int(
+            request.headers.get('X-Shop-Id') or request.args.get('shop_id') or Config.DEFAULT_SHOP_ID
+        )
+    except ValueError:
+        return jsonify({'error': 'Barbearia inválida'}), 400
+    
+    try:
+        shop = get_shop(shop_id)
+    except Exception as e:
+        print(f"Erro ao buscar barbearia: {str(e)}")
+        return jsonify({'error': 'Erro ao identificar barbearia'}), 500
+    
+    if not shop:
+        return jsonify({'error': 'Barbearia não encontrada'}), 404
+    
+    g.shop_id = shop['id']
+    return None
 
 # ====================================================================
 # AUTH ROUTES
 # ====================================================================
 
-@app.route('/auth/register', methods=['POST'])
+@api.route('/auth/register', methods=['POST'])
 def register():
     """Registra novo usuário"""
     try:
@@ -42,15 +173,15 @@ def register():
         
         # Insere usuário
         query = '''
-            INSERT INTO users (name, email, password, phone, role, created_at)
-            VALUES (%s, %s, %s, %s, 'client', NOW())
+            INSERT INTO users (name, email, password, phone, role, shop_id, created_at)
+            VALUES (%s, %s, %s, %s, 'client', %s, NOW())
             RETURNING id, name, email, role
         '''
-        execute_query(query, (name, email, hashed.decode('utf-8'), phone), fetch=False)
+        execute_query(query, (name, email, hashed.decode('utf-8'), phone, g.shop_id), fetch=False)
         
         user = execute_one('SELECT id, name, email, role FROM users WHERE email = %s', (email,))
         
-        token = create_access_token(identity=user['id'], additional_claims={'role': user['role']})
+        token = create_access_token(identity=user['id'], additional_claims=token_claims(user))
         
         return jsonify({
             'token': token,
@@ -61,7 +192,7 @@ def register():
         print(f"Erro ao registrar: {str(e)}")
         return jsonify({'error': 'Erro ao registrar usuário'}), 500
 
-@app.route('/auth/login', methods=['POST'])
+@api.route('/auth/login', methods=['POST'])
 def login():
     """Autentica usuário"""
     try:
@@ -81,7 +212,7 @@ def login():
         if not bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
             return jsonify({'error': 'Credenciais inválidas'}), 401
         
-        token = create_access_token(identity=user['id'], additional_claims={'role': user['role']})
+        token = create_access_token(identity=user['id'], additional_claims=token_claims(user))
         
         return jsonify({
             'token': token,
@@ -101,28 +232,31 @@ def login():
 # CLIENT ROUTES
 # ====================================================================
 
-@app.route('/services', methods=['GET'])
+@api.route('/services', methods=['GET'])
+@read_only_route
 def get_services():
     """Lista todos os serviços ativos"""
     try:
-        services = execute_query('SELECT * FROM services WHERE active = true ORDER BY name')
-        return jsonify(list(services)), 200
+        services = get_catalog('services', g.shop_id)
+        return jsonify(services), 200
     except Exception as e:
         print(f"Erro ao buscar serviços: {str(e)}")
         return jsonify({'error': 'Erro ao buscar serviços'}), 500
 
-@app.route('/barbers', methods=['GET'])
+@api.route('/barbers', methods=['GET'])
+@read_only_route
 def get_barbers():
     """Lista todos os barbeiros ativos"""
     try:
-        barbers = execute_query('SELECT * FROM barbers WHERE active = true ORDER BY name')
-        return jsonify(list(barbers)), 200
+        barbers = get_catalog('barbers', g.shop_id)
+        return jsonify(barbers), 200
     except Exception as e:
         print(f"Erro ao buscar barbeiros: {str(e)}")
         return jsonify({'error': 'Erro ao buscar barbeiros'}), 500
 
-@app.route('/appointments', methods=['GET'])
+@api.route('/appointments', methods=['GET'])
 @jwt_required()
+@read_only_route
 def get_appointments():
     """Lista agendamentos do usuário logado"""
     try:
@@ -136,18 +270,18 @@ def get_appointments():
             FROM appointments a
             JOIN services s ON a.service_id = s.id
             JOIN barbers b ON a.barber_id = b.id
-            WHERE a.user_id = %s
+            WHERE a.shop_id = %s AND a.user_id = %s AND a.date >= %s
             ORDER BY a.date DESC, a.time DESC
         '''
         
-        appointments = execute_query(query, (user_id,))
+        appointments = execute_query(query, (g.shop_id, user_id, retention_start()))
         return jsonify(list(appointments)), 200
         
     except Exception as e:
         print(f"Erro ao buscar agendamentos: {str(e)}")
         return jsonify({'error': 'Erro ao buscar agendamentos'}), 500
 
-@app.route('/appointments', methods=['POST'])
+@api.route('/appointments', methods=['POST'])
 @jwt_required()
 def create_appointment():
     """Cria novo agendamento"""
@@ -163,13 +297,18 @@ def create_appointment():
         if not all([service_id, barber_id, date, time]):
             return jsonify({'error': 'Dados incompletos'}), 400
         
+        # Serviço e barbeiro precisam ser da barbearia
+        if not in_catalog('services', g.shop_id, service_id) or \
+           not in_catalog('barbers', g.shop_id, barber_id):
+            return jsonify({'error': 'Serviço ou barbeiro inválido'}), 400
+        
         # Verifica conflito de horário
         conflict = execute_one(
             '''
             SELECT id FROM appointments 
-            WHERE barber_id = %s AND date = %s AND time = %s AND status != 'cancelled'
+            WHERE shop_id = %s AND barber_id = %s AND date = %s AND time = %s AND status != 'cancelled'
             ''',
-            (barber_id, date, time)
+            (g.shop_id, barber_id, date, time)
         )
         
         if conflict:
@@ -177,12 +316,13 @@ def create_appointment():
         
         # Insere agendamento
         query = '''
-            INSERT INTO appointments (user_id, service_id, barber_id, date, time, status, created_at)
-            VALUES (%s, %s, %s, %s, %s, 'confirmed', NOW())
+            INSERT INTO appointments (shop_id, user_id, service_id, barber_id, date, time, status, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, 'confirmed', NOW())
             RETURNING id
         '''
         
-        execute_query(query, (user_id, service_id, barber_id, date, time), fetch=False)
+        execute_query(query, (g.shop_id, user_id, service_id, barber_id, date, time), fetch=False)
+        mark_write()
         
         return jsonify({'message': 'Agendamento criado com sucesso'}), 201
         
@@ -190,28 +330,29 @@ def create_appointment():
         print(f"Erro ao criar agendamento: {str(e)}")
         return jsonify({'error': 'Erro ao criar agendamento'}), 500
 
-@app.route('/appointments/<int:id>', methods=['DELETE'])
+@api.route('/appointments/<int:id>', methods=['DELETE'])
 @jwt_required()
 def cancel_appointment(id):
     """Cancela agendamento"""
     try:
         user_id = get_jwt_identity()
         
-        # Verifica se agendamento pertence ao usuário
+        # Verifica se agendamento pertence ao usuário (date limita às partições retidas)
         appointment = execute_one(
-            'SELECT * FROM appointments WHERE id = %s AND user_id = %s',
-            (id, user_id)
+            'SELECT * FROM appointments WHERE id = %s AND user_id = %s AND shop_id = %s AND date >= %s',
+            (id, user_id, g.shop_id, retention_start())
         )
         
         if not appointment:
             return jsonify({'error': 'Agendamento não encontrado'}), 404
         
-        # Cancela agendamento
+        # Cancela agendamento (date limita o UPDATE a uma partição)
         execute_query(
-            "UPDATE appointments SET status = 'cancelled' WHERE id = %s",
-            (id,),
+            "UPDATE appointments SET status = 'cancelled' WHERE id = %s AND date = %s",
+            (id, appointment['date']),
             fetch=False
         )
+        mark_write()
         
         return jsonify({'message': 'Agendamento cancelado'}), 200
         
@@ -228,10 +369,14 @@ def admin_required():
     claims = get_jwt()
     if claims.get('role') != 'admin':
         return jsonify({'error': 'Acesso negado'}), 403
+    # Admin sem barbearia (shop_id nulo) administra todas
+    if claims.get('shop_id') is not None and claims['shop_id'] != g.shop_id:
+        return jsonify({'error': 'Acesso negado'}), 403
     return None
 
-@app.route('/admin/metrics', methods=['GET'])
+@api.route('/admin/metrics', methods=['GET'])
 @jwt_required()
+@read_only_route
 def get_metrics():
     """Retorna métricas do dashboard admin"""
     error = admin_required()
@@ -239,14 +384,20 @@ def get_metrics():
         return error
     
     try:
+        # Histórico considerado: período de retenção (partições anteriores são arquivadas)
+        since = retention_start()
+        
         # Total de agendamentos
-        total = execute_one('SELECT COUNT(*) as count FROM appointments')['count']
+        total = execute_one(
+            'SELECT COUNT(*) as count FROM appointments WHERE shop_id = %s AND date >= %s',
+            (g.shop_id, since)
+        )['count']
         
         # Agendamentos do dia
         today = datetime.now().strftime('%Y-%m-%d')
         today_count = execute_one(
-            "SELECT COUNT(*) as count FROM appointments WHERE date = %s AND status != 'cancelled'",
-            (today,)
+            "SELECT COUNT(*) as count FROM appointments WHERE shop_id = %s AND date = %s AND status != 'cancelled'",
+            (g.shop_id, today)
         )['count']
         
         # Receita estimada
@@ -255,8 +406,9 @@ def get_metrics():
             SELECT COALESCE(SUM(s.price), 0) as total
             FROM appointments a
             JOIN services s ON a.service_id = s.id
-            WHERE a.status = 'confirmed'
-            '''
+            WHERE a.shop_id = %s AND a.date >= %s AND a.status = 'confirmed'
+            ''',
+            (g.shop_id, since)
         )['total']
         
         # Serviços mais usados
@@ -265,11 +417,12 @@ def get_metrics():
             SELECT s.name, COUNT(*) as count
             FROM appointments a
             JOIN services s ON a.service_id = s.id
-            WHERE a.status != 'cancelled'
+            WHERE a.shop_id = %s AND a.date >= %s AND a.status != 'cancelled'
             GROUP BY s.name
             ORDER BY count DESC
             LIMIT 5
-            '''
+            ''',
+            (g.shop_id, since)
         )
         
         return jsonify({
@@ -283,8 +436,9 @@ def get_metrics():
         print(f"Erro ao buscar métricas: {str(e)}")
         return jsonify({'error': 'Erro ao buscar métricas'}), 500
 
-@app.route('/admin/appointments', methods=['GET'])
+@api.route('/admin/appointments', methods=['GET'])
 @jwt_required()
+@read_only_route
 def admin_get_appointments():
     """Lista todos os agendamentos (admin)"""
     error = admin_required()
@@ -292,6 +446,17 @@ def admin_get_appointments():
         return error
     
     try:
+        # Período (YYYY-MM-DD); padrão: últimos ADMIN_APPOINTMENTS_DAYS dias em diante
+        default_from = (datetime.now() - timedelta(days=Config.ADMIN_APPOINTMENTS_DAYS)).strftime('%Y-%m-%d')
+        date_from = request.args.get('from', default_from)
+        date_to = request.args.get('to')
+        try:
+            datetime.strptime(date_from, '%Y-%m-%d')
+            if date_to:
+                datetime.strptime(date_to, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Data inválida. Use o formato AAAA-MM-DD'}), 400
+        
         query = '''
             SELECT 
                 a.id, a.date, a.time, a.status, a.created_at,
@@ -302,18 +467,75 @@ def admin_get_appointments():
             JOIN users u ON a.user_id = u.id
             JOIN services s ON a.service_id = s.id
             JOIN barbers b ON a.barber_id = b.id
+            WHERE a.shop_id = %s AND a.date >= %s AND (%s IS NULL OR a.date <= %s)
             ORDER BY a.date DESC, a.time DESC
         '''
         
-        appointments = execute_query(query)
+        appointments = execute_query(query, (g.shop_id, date_from, date_to, date_to))
         return jsonify(list(appointments)), 200
         
     except Exception as e:
         print(f"Erro ao buscar agendamentos: {str(e)}")
         return jsonify({'error': 'Erro ao buscar agendamentos'}), 500
 
-@app.route('/admin/users', methods=['GET'])
+@api.route('/admin/appointments/stream-token', methods=['POST'])
+@jwt_required()
+def admin_appointments_stream_token():
+    """Token curto, só para abrir o feed SSE da barbearia (admin)"""
+    error = admin_required()
+    if error:
+        return error
+    
+    # EventSource não envia headers e o token vai na URL (logs, histórico):
+    # nunca o token principal. O tipo refresh é recusado pelas demais rotas
+    token = create_refresh_token(
+        identity=get_jwt_identity(),
+        additional_claims={'role': 'admin', 'shop_id': g.shop_id, 'scope': 'stream'},
+        expires_delta=timedelta(seconds=Config.SSE_TOKEN_SECONDS)
+    )
+    return jsonify({'token': token})
+
+@api.route('/admin/appointments/stream', methods=['GET'])
+@jwt_required(refresh=True, locations=['query_string'])  # ?jwt= com token de /stream-token
+def admin_appointments_stream():
+    """Feed SSE das alterações nos agendamentos da barbearia (admin)"""
+    if get_jwt().get('scope') != 'stream':
+        return jsonify({'error': 'Acesso negado'}), 403
+    error = admin_required()
+    if error:
+        return error
+    
+    shop_id = g.shop_id
+    events = subscribe(shop_id)
+    if events is None:
+        # Limite de streams do worker: o cliente tenta de novo (outro worker ou depois)
+        response = jsonify({'error': 'Limite de conexões em tempo real atingido'})
+        response.headers['Retry-After'] = str(Config.SSE_RECONNECT_SECONDS)
+        return response, 503
+    
+    def stream():
+        yield f"retry: {Config.SSE_RECONNECT_SECONDS * 1000}\n\n"
+        while True:
+            try:
+                event = events.get(timeout=Config.SSE_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                # Mantém proxies abertos e detecta cliente desconectado
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event)
+    
+    response = Response(
+        stream(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Roda ao fechar a resposta, mesmo se o stream nunca começar a ser enviado
+    response.call_on_close(lambda: unsubscribe(shop_id, events))
+    return response
+
+@api.route('/admin/users', methods=['GET'])
 @jwt_required()
+@read_only_route
 def admin_get_users():
     """Lista todos os usuários"""
     error = admin_required()
@@ -321,8 +543,20 @@ def admin_get_users():
         return error
     
     try:
+        # Clientes cadastrados na barbearia ou que já agendaram nela
+        # (UNION em vez de OR para usar idx_users_shop e idx_appointments_shop_user)
         users = execute_query(
-            'SELECT id, name, email, phone, role, created_at FROM users ORDER BY created_at DESC'
+            '''
+            SELECT id, name, email, phone, role, created_at
+            FROM users
+            WHERE shop_id = %s
+            UNION
+            SELECT u.id, u.name, u.email, u.phone, u.role, u.created_at
+            FROM users u
+            JOIN (SELECT DISTINCT user_id FROM appointments WHERE shop_id = %s) a ON a.user_id = u.id
+            ORDER BY created_at DESC
+            ''',
+            (g.shop_id, g.shop_id)
         )
         return jsonify(list(users)), 200
         
@@ -330,7 +564,7 @@ def admin_get_users():
         print(f"Erro ao buscar usuários: {str(e)}")
         return jsonify({'error': 'Erro ao buscar usuários'}), 500
 
-@app.route('/admin/services', methods=['POST'])
+@api.route('/admin/services', methods=['POST'])
 @jwt_required()
 def admin_create_service():
     """Cria novo serviço"""
@@ -349,12 +583,14 @@ def admin_create_service():
             return jsonify({'error': 'Dados incompletos'}), 400
         
         query = '''
-            INSERT INTO services (name, description, price, duration, active)
-            VALUES (%s, %s, %s, %s, true)
+            INSERT INTO services (shop_id, name, description, price, duration, active)
+            VALUES (%s, %s, %s, %s, %s, true)
             RETURNING id
         '''
         
-        execute_query(query, (name, description, price, duration), fetch=False)
+        execute_query(query, (g.shop_id, name, description, price, duration), fetch=False)
+        refresh_catalog('services', g.shop_id)
+        mark_write()
         
         return jsonify({'message': 'Serviço criado com sucesso'}), 201
         
@@ -362,7 +598,7 @@ def admin_create_service():
         print(f"Erro ao criar serviço: {str(e)}")
         return jsonify({'error': 'Erro ao criar serviço'}), 500
 
-@app.route('/admin/services/<int:id>', methods=['DELETE'])
+@api.route('/admin/services/<int:id>', methods=['DELETE'])
 @jwt_required()
 def admin_delete_service(id):
     """Remove serviço"""
@@ -371,14 +607,20 @@ def admin_delete_service(id):
         return error
     
     try:
-        execute_query('UPDATE services SET active = false WHERE id = %s', (id,), fetch=False)
+        execute_query(
+            'UPDATE services SET active = false WHERE id = %s AND shop_id = %s',
+            (id, g.shop_id),
+            fetch=False
+        )
+        refresh_catalog('services', g.shop_id)
+        mark_write()
         return jsonify({'message': 'Serviço removido'}), 200
         
     except Exception as e:
         print(f"Erro ao remover serviço: {str(e)}")
         return jsonify({'error': 'Erro ao remover serviço'}), 500
 
-@app.route('/admin/barbers', methods=['POST'])
+@api.route('/admin/barbers', methods=['POST'])
 @jwt_required()
 def admin_create_barber():
     """Cadastra novo barbeiro"""
@@ -395,12 +637,14 @@ def admin_create_barber():
             return jsonify({'error': 'Nome obrigatório'}), 400
         
         query = '''
-            INSERT INTO barbers (name, phone, active)
-            VALUES (%s, %s, true)
+            INSERT INTO barbers (shop_id, name, phone, active)
+            VALUES (%s, %s, %s, true)
             RETURNING id
         '''
         
-        execute_query(query, (name, phone), fetch=False)
+        execute_query(query, (g.shop_id, name, phone), fetch=False)
+        refresh_catalog('barbers', g.shop_id)
+        mark_write()
         
         return jsonify({'message': 'Barbeiro cadastrado com sucesso'}), 201
         
@@ -408,7 +652,7 @@ def admin_create_barber():
         print(f"Erro ao cadastrar barbeiro: {str(e)}")
         return jsonify({'error': 'Erro ao cadastrar barbeiro'}), 500
 
-@app.route('/admin/barbers/<int:id>', methods=['DELETE'])
+@api.route('/admin/barbers/<int:id>', methods=['DELETE'])
 @jwt_required()
 def admin_delete_barber(id):
     """Remove barbeiro"""
@@ -417,7 +661,13 @@ def admin_delete_barber(id):
         return error
     
     try:
-        execute_query('UPDATE barbers SET active = false WHERE id = %s', (id,), fetch=False)
+        execute_query(
+            'UPDATE barbers SET active = false WHERE id = %s AND shop_id = %s',
+            (id, g.shop_id),
+            fetch=False
+        )
+        refresh_catalog('barbers', g.shop_id)
+        mark_write()
         return jsonify({'message': 'Barbeiro removido'}), 200
         
     except Exception as e:
@@ -428,7 +678,7 @@ def admin_delete_barber(id):
 # WHATSAPP WEBHOOK
 # ====================================================================
 
-@app.route('/webhook/evolution', methods=['POST'])
+@api.route('/webhook/evolution', methods=['POST'])
 def webhook_evolution():
     """Recebe mensagens do WhatsApp via Evolution"""
     try:
@@ -440,6 +690,11 @@ def webhook_evolution():
         if event != 'messages.upsert':
             return jsonify({'status': 'ignored'}), 200
         
+        # Cada barbearia tem sua instância Evolution
+        shop = get_shop_by_instance(data.get('instance') or Config.EVOLUTION_INSTANCE)
+        if not shop:
+            return jsonify({'status': 'ignored'}), 200
+        
         message_data = data.get('data', {})
         key = message_data.get('key', {})
         message = message_data.get('message', {})
@@ -451,10 +706,10 @@ def webhook_evolution():
             return jsonify({'status': 'ignored'}), 200
         
         # Processa mensagem
-        response = process_whatsapp_message(from_number, message_text)
+        response = process_whatsapp_message(shop['id'], from_number, message_text)
         
         # Envia resposta
-        send_whatsapp_message(from_number, response)
+        send_whatsapp_message(shop['evolution_instance'], from_number, response)
         
         return jsonify({'status': 'processed'}), 200
         
@@ -462,23 +717,23 @@ def webhook_evolution():
         print(f"Erro no webhook: {str(e)}")
         return jsonify({'error': 'Erro ao processar mensagem'}), 500
 
-def process_whatsapp_message(phone, message):
+def process_whatsapp_message(shop_id, phone, message):
     """Processa mensagem do WhatsApp e retorna resposta"""
     try:
         # Busca ou cria sessão
         session = execute_one(
-            'SELECT * FROM whatsapp_sessions WHERE phone = %s',
-            (phone,)
+            'SELECT * FROM whatsapp_sessions WHERE shop_id = %s AND phone = %s',
+            (shop_id, phone)
         )
         
         if not session:
             # Cria nova sessão
             execute_query(
                 '''
-                INSERT INTO whatsapp_sessions (phone, step, created_at, updated_at)
-                VALUES (%s, 'menu', NOW(), NOW())
+                INSERT INTO whatsapp_sessions (shop_id, phone, step, created_at, updated_at)
+                VALUES (%s, %s, 'menu', NOW(), NOW())
                 ''',
-                (phone,),
+                (shop_id, phone),
                 fetch=False
             )
             session = {'step': 'menu', 'data': {}}
@@ -489,8 +744,8 @@ def process_whatsapp_message(phone, message):
         # Menu inicial
         if step == 'menu':
             if message == '1':
-                update_session(phone, 'service', {})
-                services = execute_query('SELECT * FROM services WHERE active = true')
+                update_session(shop_id, phone, 'service', {})
+                services = get_catalog('services', shop_id)
                 response = "📋 *Serviços Disponíveis:*\n\n"
                 for i, svc in enumerate(services, 1):
                     response += f"{i}. {svc['name']} - R$ {svc['price']} ({svc['duration']} min)\n"
@@ -501,15 +756,15 @@ def process_whatsapp_message(phone, message):
         
         # Seleção de serviço
         elif step == 'service':
-            services = execute_query('SELECT * FROM services WHERE active = true')
+            services = get_catalog('services', shop_id)
             try:
                 idx = int(message) - 1
                 if 0 <= idx < len(services):
                     service = services[idx]
                     session_data['service_id'] = service['id']
-                    update_session(phone, 'barber', session_data)
+                    update_session(shop_id, phone, 'barber', session_data)
                     
-                    barbers = execute_query('SELECT * FROM barbers WHERE active = true')
+                    barbers = get_catalog('barbers', shop_id)
                     response = "💈 *Escolha o barbeiro:*\n\n"
                     for i, barber in enumerate(barbers, 1):
                         response += f"{i}. {barber['name']}\n"
@@ -522,13 +777,13 @@ def process_whatsapp_message(phone, message):
         
         # Seleção de barbeiro
         elif step == 'barber':
-            barbers = execute_query('SELECT * FROM barbers WHERE active = true')
+            barbers = get_catalog('barbers', shop_id)
             try:
                 idx = int(message) - 1
                 if 0 <= idx < len(barbers):
                     barber = barbers[idx]
                     session_data['barber_id'] = barber['id']
-                    update_session(phone, 'date', session_data)
+                    update_session(shop_id, phone, 'date', session_data)
                     return "📅 *Digite a data desejada:*\n\nFormato: DD/MM/AAAA\nExemplo: 25/01/2026"
                 else:
                     return "Opção inválida. Tente novamente:"
@@ -541,7 +796,7 @@ def process_whatsapp_message(phone, message):
                 date_obj = datetime.strptime(message, '%d/%m/%Y')
                 date_str = date_obj.strftime('%Y-%m-%d')
                 session_data['date'] = date_str
-                update_session(phone, 'time', session_data)
+                update_session(shop_id, phone, 'time', session_data)
                 
                 return "🕐 *Digite o horário desejado:*\n\nFormato: HH:MM\nExemplo: 14:30"
             except:
@@ -557,16 +812,16 @@ def process_whatsapp_message(phone, message):
                 conflict = execute_one(
                     '''
                     SELECT id FROM appointments 
-                    WHERE barber_id = %s AND date = %s AND time = %s AND status != 'cancelled'
+                    WHERE shop_id = %s AND barber_id = %s AND date = %s AND time = %s AND status != 'cancelled'
                     ''',
-                    (session_data['barber_id'], session_data['date'], time_str)
+                    (shop_id, session_data['barber_id'], session_data['date'], time_str)
                 )
                 
                 if conflict:
                     return "⚠️ Horário indisponível. Tente outro horário:"
                 
                 session_data['time'] = time_str
-                update_session(phone, 'confirm', session_data)
+                update_session(shop_id, phone, 'confirm', session_data)
                 
                 # Busca dados para confirmação
                 service = execute_one('SELECT * FROM services WHERE id = %s', (session_data['service_id'],))
@@ -597,11 +852,11 @@ Digite *SIM* para confirmar ou *NÃO* para cancelar:
                     hashed = bcrypt.hashpw('whatsapp123'.encode('utf-8'), bcrypt.gensalt())
                     execute_query(
                         '''
-                        INSERT INTO users (name, email, password, phone, role, created_at)
-                        VALUES (%s, %s, %s, %s, 'client', NOW())
+                        INSERT INTO users (name, email, password, phone, role, shop_id, created_at)
+                        VALUES (%s, %s, %s, %s, 'client', %s, NOW())
                         RETURNING id
                         ''',
-                        (f'Cliente {phone}', f'{phone}@whatsapp.temp', hashed.decode('utf-8'), phone),
+                        (f'Cliente {phone}', f'{phone}@whatsapp.temp', hashed.decode('utf-8'), phone, shop_id),
                         fetch=False
                     )
                     user = execute_one('SELECT * FROM users WHERE phone = %s', (phone,))
@@ -618,21 +873,29 @@ Digite *SIM* para confirmar ou *NÃO* para cancelar:
                 # Cria agendamento
                 execute_query(
                     '''
-                    INSERT INTO appointments (user_id, service_id, barber_id, date, time, status, created_at, origin)
-                    VALUES (%s, %s, %s, %s, %s, 'confirmed', NOW(), 'whatsapp')
+                    INSERT INTO appointments (shop_id, user_id, service_id, barber_id, date, time, status, created_at, origin)
+                    VALUES (%s, %s, %s, %s, %s, %s, 'confirmed', NOW(), 'whatsapp')
                     ''',
-                    (user['id'], session_data['service_id'], session_data['barber_id'], 
+                    (shop_id, user['id'], session_data['service_id'], session_data['barber_id'], 
                      session_data['date'], session_data['time']),
                     fetch=False
                 )
                 
                 # Limpa sessão
-                execute_query('DELETE FROM whatsapp_sessions WHERE phone = %s', (phone,), fetch=False)
+                execute_query(
+                    'DELETE FROM whatsapp_sessions WHERE shop_id = %s AND phone = %s',
+                    (shop_id, phone),
+                    fetch=False
+                )
                 
                 return "✅ *Agendamento confirmado com sucesso!*\n\nVocê receberá uma confirmação em breve.\n\nDigite *1* para fazer outro agendamento."
             else:
                 # Limpa sessão
-                execute_query('DELETE FROM whatsapp_sessions WHERE phone = %s', (phone,), fetch=False)
+                execute_query(
+                    'DELETE FROM whatsapp_sessions WHERE shop_id = %s AND phone = %s',
+                    (shop_id, phone),
+                    fetch=False
+                )
                 return "❌ Agendamento cancelado.\n\nDigite *1* para começar novamente."
         
         return "Digite *1* para agendar um horário."
@@ -641,22 +904,24 @@ Digite *SIM* para confirmar ou *NÃO* para cancelar:
         print(f"Erro ao processar mensagem: {str(e)}")
         return "Desculpe, ocorreu um erro. Digite *1* para tentar novamente."
 
-def update_session(phone, step, data):
+def update_session(shop_id, phone, step, data):
     """Atualiza sessão do WhatsApp"""
     execute_query(
         '''
         UPDATE whatsapp_sessions 
         SET step = %s, data = %s, updated_at = NOW()
-        WHERE phone = %s
+        WHERE shop_id = %s AND phone = %s
         ''',
-        (step, json.dumps(data), phone),
+        (step, json.dumps(data), shop_id, phone),
         fetch=False
     )
 
-def send_whatsapp_message(phone, message):
+def send_whatsapp_message(instance, phone, message):
     """Envia mensagem via Evolution API"""
     try:
-        url = f"{Config.EVOLUTION_HOST}/message/sendText/{Config.EVOLUTION_INSTANCE}"
+        import requests  # só o webhook usa; fica fora do boot do worker
+        
+        url = f"{Config.EVOLUTION_HOST}/message/sendText/{instance}"
         headers = {
             'apikey': Config.EVOLUTION_API_KEY,
             'Content-Type': 'application/json'
@@ -677,10 +942,50 @@ def send_whatsapp_message(phone, message):
 # HEALTH CHECK
 # ====================================================================
 
-@app.route('/health', methods=['GET'])
+@api.route('/health', methods=['GET'])
 def health():
     """Health check"""
     return jsonify({'status': 'ok'}), 200
 
+# ====================================================================
+# APP FACTORY
+# ====================================================================
+
+def warmup():
+    """Abre conexões do pool e preenche caches antes do worker receber tráfego"""
+    started = time.perf_counter()
+    opened = 0
+    try:
+        opened = warmup_pool()
+        for shop_id in Config.WARMUP_SHOP_IDS or [Config.DEFAULT_SHOP_ID]:
+            if get_shop(shop_id):
+                get_catalog('services', shop_id)
+                get_catalog('barbers', shop_id)
+    except Exception as e:
+        print(f"Erro no warmup: {str(e)}")
+    elapsed = time.perf_counter() - started
+    print(f"Warmup: {opened} conexão(ões) aberta(s) em {elapsed * 1000:.0f} ms")
+    return elapsed
+
+def create_app():
+    """Cria a aplicação Flask (executado uma vez por worker)"""
+    started = time.perf_counter()
+    
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = Config.JWT_SECRET_KEY
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = Config.JWT_ACCESS_TOKEN_EXPIRES
+    
+    CORS(app, expose_headers=[READ_AFTER_HEADER])
+    jwt.init_app(app)
+    app.register_blueprint(api)
+    
+    app.config['WARMUP_SECONDS'] = warmup() if Config.WARMUP_ENABLED else 0.0
+    app.config['STARTUP_SECONDS'] = time.perf_counter() - started
+    return app
+
+# Gunicorn carrega app:app em cada worker (sem --preload), então o warmup
+# roda no worker antes de aceitar conexões
+app = create_app()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=Config.PORT, debug=False)
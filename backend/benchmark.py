@@ -0,0 +1,42 @@
+"""Mede o tempo de boot do worker e a latência das primeiras requisições.
+
+Uso:
+    python benchmark.py [rota ...]    (padrão: /health /services /barbers)
+
+Reporta o tempo de import do app.py, o tempo de create_app() (incluindo o
+warmup) e, por rota, a latência da primeira e da segunda requisição.
+Compare com WARMUP_ENABLED=false para ver o custo de cold start.
+"""
+import sys
+import time
+
+started = time.perf_counter()
+import app as app_module  # noqa: E402 (o import é o que está sendo medido)
+import_seconds = time.perf_counter() - started
+
+def measure(client, path):
+    """Latência (ms) e status de uma requisição GET"""
+    started = time.perf_counter()
+    response = client.get(path)
+    return (time.perf_counter() - started) * 1000, response.status_code
+
+def main():
+    app = app_module.app
+    routes = sys.argv[1:] or ['/health', '/services', '/barbers']
+    startup = app.config['STARTUP_SECONDS']
+
+    print(f"Import do app.py (total):   {import_seconds * 1000:8.1f} ms")
+    print(f"  create_app():             {startup * 1000:8.1f} ms")
+    print(f"    warmup:                 {app.config['WARMUP_SECONDS'] * 1000:8.1f} ms")
+    print(f"  imports e rotas:          {(import_seconds - startup) * 1000:8.1f} ms")
+    print()
+    print(f"{'Rota':<24}{'1ª (ms)':>10}{'2ª (ms)':>10}  status")
+
+    client = app.test_client()
+    for path in routes:
+        first, status = measure(client, path)
+        second, _ = measure(client, path)
+        print(f"{path:<24}{first:>10.1f}{second:>10.1f}  {status}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+import time
+from config import Config
+
+# Cache em memória por worker: {chave: (expira_em, valor)}
+_cache = {}
+
+def cache_get(key):
+    """Retorna valor em cache ou None se ausente/expirado"""
+    entry = _cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    _cache.pop(key, None)
+    return None
+
+def cache_set(key, value, ttl=None):
+    """Guarda valor em cache por ttl segundos (padrão CATALOG_CACHE_SECONDS)"""
+    if ttl is None:
+        ttl = Config.CATALOG_CACHE_SECONDS
+    _cache[key] = (time.monotonic() + ttl, value)
+    return value
+
+def cache_delete(key):
+    """Remove chave do cache"""
+    _cache.pop(key, None)
@@ -10,6 +10,31 @@ class Config:
     DB_USER = os.getenv('DB_USER', 'barber_db')
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'senha_forte')
     DB_NAME = os.getenv('DB_NAME', 'barber_db')
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 4))  # conexões mantidas abertas (abertas no warmup)
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+    
+    # Réplicas de leitura (opcional, hosts separados por vírgula)
+    DB_REPLICA_HOSTS = [h.strip() for h in os.getenv('DB_REPLICA_HOSTS', '').split(',') if h.strip()]
+    DB_REPLICA_CONNECT_TIMEOUT = int(os.getenv('DB_REPLICA_CONNECT_TIMEOUT', 2))
+    DB_REPLICA_RETRY_SECONDS = int(os.getenv('DB_REPLICA_RETRY_SECONDS', 30))
+    DB_STICKY_SECONDS = int(os.getenv('DB_STICKY_SECONDS', 10))
+    
+    # Multi-barbearia
+    DEFAULT_SHOP_ID = int(os.getenv('DEFAULT_SHOP_ID', 1))
+    CATALOG_CACHE_SECONDS = int(os.getenv('CATALOG_CACHE_SECONDS', 15))
+    
+    # Particionamento de appointments
+    APPOINTMENTS_MONTHS_AHEAD = int(os.getenv('APPOINTMENTS_MONTHS_AHEAD', 3))
+    APPOINTMENTS_RETENTION_MONTHS = int(os.getenv('APPOINTMENTS_RETENTION_MONTHS', 24))
+    APPOINTMENTS_ARCHIVE_DIR = os.getenv('APPOINTMENTS_ARCHIVE_DIR', 'archive')
+    ADMIN_APPOINTMENTS_DAYS = int(os.getenv('ADMIN_APPOINTMENTS_DAYS', 90))
+    
+    # Feed em tempo real (SSE) do painel admin
+    SSE_TOKEN_SECONDS = int(os.getenv('SSE_TOKEN_SECONDS', 60))  # validade do token de /stream-token
+    SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', 4))  # por worker; manter abaixo de --threads
+    SSE_KEEPALIVE_SECONDS = int(os.getenv('SSE_KEEPALIVE_SECONDS', 10))
+    SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', 100))
+    SSE_RECONNECT_SECONDS = int(os.getenv('SSE_RECONNECT_SECONDS', 5))
     
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET', 'chave_super_secreta')
@@ -18,6 +43,10 @@ class Config:
     # Flask
     PORT = int(os.getenv('PORT', 3000))
     
+    # Warmup do worker (conexões e caches antes de receber tráfego)
+    WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() == 'true'
+    WARMUP_SHOP_IDS = [int(i) for i in os.getenv('WARMUP_SHOP_IDS', '').split(',') if i.strip()]
+    
     # Evolution API
     EVOLUTION_API_KEY = os.getenv('EVOLUTION_API_KEY', '')
     EVOLUTION_HOST = os.getenv('EVOLUTION_HOST', 'http://evolution:8080')
@@ -0,0 +1,11 @@
+from datetime import date
+from config import Config
+
+def month_start(day, offset=0):
+    """Primeiro dia do mês de day deslocado em offset meses"""
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+def retention_start(today=None):
+    """Data mais antiga mantida no banco (início da retenção)"""
+    return month_start(today or date.today(), -Config.APPOINTMENTS_RETENTION_MONTHS)
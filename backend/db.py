@@ -1,47 +1,177 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 from config import Config
 
-def get_db_connection():
-    """Cria conexão com PostgreSQL"""
+# Rotas marcadas como somente leitura podem usar as réplicas
+_read_only = ContextVar('read_only', default=False)
+
+# Réplicas que falharam ficam fora da rotação até este instante
+_replica_down_until = {}
+_replica_cycle = itertools.cycle(Config.DB_REPLICA_HOSTS) if Config.DB_REPLICA_HOSTS else None
+
+# Um pool por host, criado sob demanda em cada worker. O psycopg2 só mantém
+# abertas, ao devolver, até minconn conexões: DB_POOL_MIN é o tamanho ocioso
+_pools = {}
+_pools_lock = threading.Lock()
+_conn_hosts = {}  # id(conexão) -> host de origem
+
+def _get_pool(host, **kwargs):
+    pool = _pools.get(host)
+    if pool is None:
+        # Threads do gthread e o listener do SSE podem criar o mesmo pool juntos
+        with _pools_lock:
+            pool = _pools.get(host)
+            if pool is None:
+                pool = _pools[host] = ThreadedConnectionPool(
+                    max(1, Config.DB_POOL_MIN),
+                    max(1, Config.DB_POOL_MIN, Config.DB_POOL_MAX),
+                    host=host,
+                    port=Config.DB_PORT,
+                    user=Config.DB_USER,
+                    password=Config.DB_PASSWORD,
+                    database=Config.DB_NAME,
+                    cursor_factory=RealDictCursor,
+                    **kwargs
+                )
+    return pool
+
+def _connect(host, **kwargs):
+    conn = _get_pool(host, **kwargs).getconn()
+    _conn_hosts[id(conn)] = host
+    return conn
+
+def release_connection(conn, discard=False):
+    """Devolve conexão ao pool (descarta se quebrada)"""
+    host = _conn_hosts.pop(id(conn))
+    _pools[host].putconn(conn, close=discard or bool(conn.closed))
+
+def _release_after_error(conn, error):
+    """Desfaz transação e devolve conexão; réplica com conexão quebrada sai da rotação"""
+    broken = isinstance(error, psycopg2.OperationalError) or bool(conn.closed)
+    if not broken:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+    host = _conn_hosts.get(id(conn))
+    if broken and host != Config.DB_HOST:
+        _replica_down_until[host] = time.monotonic() + Config.DB_REPLICA_RETRY_SECONDS
+    release_connection(conn, discard=broken)
+
+def warmup_pool(size=None):
+    """Abre conexões no primário e réplicas antes de receber tráfego"""
+    if size is None:
+        size = Config.DB_POOL_MIN
+    hosts = [(Config.DB_HOST, {})] + [
+        (host, {'connect_timeout': Config.DB_REPLICA_CONNECT_TIMEOUT}) for host in Config.DB_REPLICA_HOSTS
+    ]
+    opened = 0
+    for host, kwargs in hosts:
+        conns = []
+        try:
+            for _ in range(size):
+                conn = _connect(host, **kwargs)
+                conns.append(conn)
+                cursor = conn.cursor()
+                cursor.execute('SELECT 1')
+                conn.rollback()
+                opened += 1
+        except psycopg2.OperationalError as e:
+            print(f"Warmup: host {host} indisponível: {str(e)}")
+            if host != Config.DB_HOST:
+                _replica_down_until[host] = time.monotonic() + Config.DB_REPLICA_RETRY_SECONDS
+        finally:
+            for conn in conns:
+                release_connection(conn)
+    return opened
+
+def _get_replica_connection():
+    """Tenta conectar em uma réplica saudável; None se nenhuma responder"""
+    if not _replica_cycle:
+        return None
+
+    now = time.monotonic()
+    for _ in range(len(Config.DB_REPLICA_HOSTS)):
+        host = next(_replica_cycle)
+        if _replica_down_until.get(host, 0) > now:
+            continue
+        try:
+            return _connect(host, connect_timeout=Config.DB_REPLICA_CONNECT_TIMEOUT)
+        except psycopg2.OperationalError as e:
+            print(f"Réplica {host} indisponível: {str(e)}")
+            _replica_down_until[host] = now + Config.DB_REPLICA_RETRY_SECONDS
+    return None
+
+def get_db_connection(readonly=False):
+    """Obtém conexão do pool (réplica quando readonly, senão primário)"""
+    if readonly:
+        conn = _get_replica_connection()
+        if conn:
+            return conn
+    return _connect(Config.DB_HOST)
+
+def get_listen_connection():
+    """Conexão dedicada (fora do pool) ao primário para LISTEN"""
     conn = psycopg2.connect(
         host=Config.DB_HOST,
         port=Config.DB_PORT,
         user=Config.DB_USER,
         password=Config.DB_PASSWORD,
-        database=Config.DB_NAME,
-        cursor_factory=RealDictCursor
+        database=Config.DB_NAME
     )
+    conn.autocommit = True
     return conn
 
-def execute_query(query, params=None, fetch=True):
-    """Executa query com tratamento de erro"""
-    conn = get_db_connection()
+@contextmanager
+def read_only(primary=False):
+    """Direciona as leituras do bloco para as réplicas (ou ao primário, se primary)"""
+    token = _read_only.set(not primary)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+def _run(conn, query, params, fetch, one):
     cursor = conn.cursor()
+    cursor.execute(query, params)
+    if not fetch:
+        conn.commit()
+        return True
+    result = cursor.fetchone() if one else cursor.fetchall()
+    conn.rollback()
+    return result
+
+def _execute(query, params, readonly, fetch=True, one=False):
+    conn = get_db_connection(readonly=readonly)
     try:
-        cursor.execute(query, params)
-        if fetch:
-            result = cursor.fetchall()
-            conn.close()
-            return result
-        else:
-            conn.commit()
-            conn.close()
-            return True
+        result = _run(conn, query, params, fetch, one)
     except Exception as e:
-        conn.rollback()
-        conn.close()
-        raise e
+        on_replica = _conn_hosts.get(id(conn)) != Config.DB_HOST
+        _release_after_error(conn, e)
+        if not (on_replica and isinstance(e, psycopg2.OperationalError)):
+            raise e
+        # Conexão do pool em réplica que caiu: a leitura é repetida uma vez no primário
+        print(f"Leitura na réplica falhou, repetindo no primário: {str(e)}")
+        conn = _connect(Config.DB_HOST)
+        try:
+            result = _run(conn, query, params, fetch, one)
+        except Exception as e:
+            _release_after_error(conn, e)
+            raise e
+    release_connection(conn)
+    return result
+
+def execute_query(query, params=None, fetch=True):
+    """Executa query com tratamento de erro"""
+    # Escritas sempre vão para o primário
+    return _execute(query, params, readonly=fetch and _read_only.get(), fetch=fetch)
 
 def execute_one(query, params=None):
     """Executa query e retorna um único resultado"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(query, params)
-        result = cursor.fetchone()
-        conn.close()
-        return result
-    except Exception as e:
-        conn.close()
-        raise e
+    return _execute(query, params, readonly=_read_only.get(), one=True)
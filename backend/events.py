@@ -0,0 +1,132 @@
+"""Feed de alterações de agendamentos para o painel admin.
+
+Um trigger no banco publica cada alteração em appointments via NOTIFY.
+Cada worker mantém uma única conexão em LISTEN (iniciada na primeira
+assinatura) e repassa os eventos às filas dos painéis conectados da
+mesma barbearia, que os enviam por Server-Sent Events.
+"""
+import json
+import queue
+import select
+import threading
+import time
+from config import Config
+from db import execute_one, get_listen_connection
+
+CHANNEL = 'appointments_changes'
+
+# Evento que pede ao painel para recarregar tudo (eventos podem ter sido perdidos)
+RESYNC = {'type': 'resync', 'data': {}}
+
+_subscribers = {}  # shop_id -> set de filas
+_lock = threading.Lock()
+_listener = None
+
+def subscribe(shop_id):
+    """Registra um painel da barbearia e retorna sua fila de eventos.
+
+    Retorna None se o worker já atende SSE_MAX_STREAMS painéis: cada stream
+    ocupa uma thread e o restante precisa ficar livre para a API.
+    """
+    q = queue.Queue(maxsize=Config.SSE_QUEUE_SIZE)
+    with _lock:
+        if sum(len(subs) for subs in _subscribers.values()) >= Config.SSE_MAX_STREAMS:
+            return None
+        _subscribers.setdefault(shop_id, set()).add(q)
+        _ensure_listener()
+    return q
+
+def unsubscribe(shop_id, q):
+    """Remove painel desconectado"""
+    with _lock:
+        subs = _subscribers.get(shop_id)
+        if subs:
+            subs.discard(q)
+            if not subs:
+                del _subscribers[shop_id]
+
+def _queues(shop_id=None):
+    with _lock:
+        if shop_id is None:
+            return [q for subs in _subscribers.values() for q in subs]
+        return list(_subscribers.get(shop_id, ()))
+
+def _put(q, event):
+    try:
+        q.put_nowait(event)
+    except queue.Full:
+        # Painel lento: descarta pendências e pede recarga completa
+        with q.mutex:
+            q.queue.clear()
+        q.put_nowait(RESYNC)
+
+def format_sse(event):
+    """Serializa evento no formato text/event-stream"""
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+def _dispatch(payload):
+    """Completa o evento do trigger com nomes e entrega aos painéis da barbearia"""
+    data = json.loads(payload)
+    queues = _queues(data['shop_id'])
+    if not queues:
+        return
+
+    # Uma consulta por evento por worker, independente de quantos painéis
+    if data['op'] != 'DELETE':
+        names = execute_one(
+            '''
+            SELECT
+                u.name as client_name, u.phone as client_phone,
+                s.name as service_name, s.price::float as price,
+                b.name as barber_name
+            FROM appointments a
+            JOIN users u ON a.user_id = u.id
+            JOIN services s ON a.service_id = s.id
+            JOIN barbers b ON a.barber_id = b.id
+            WHERE a.id = %s AND a.date = %s
+            ''',
+            (data['id'], data['date'])
+        )
+        if names:
+            data.update(names)
+
+    event = {'type': 'appointment', 'data': data}
+    for q in queues:
+        _put(q, event)
+
+def _listen_forever():
+    """Loop do listener: reconecta em caso de falha"""
+    reconnect = False
+    while True:
+        conn = None
+        try:
+            conn = get_listen_connection()
+            conn.cursor().execute(f'LISTEN {CHANNEL}')
+            if reconnect:
+                for q in _queues():
+                    _put(q, RESYNC)
+
+            while True:
+                if select.select([conn], [], [], Config.SSE_KEEPALIVE_SECONDS) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        _dispatch(notify.payload)
+                    except Exception as e:
+                        print(f"Erro ao repassar evento de agendamento: {str(e)}")
+        except Exception as e:
+            print(f"Listener de agendamentos desconectado: {str(e)}")
+        finally:
+            if conn is not None:
+                conn.close()
+        reconnect = True
+        time.sleep(Config.SSE_RECONNECT_SECONDS)
+
+def _ensure_listener():
+    """Inicia o listener do worker (chamado com _lock adquirido)"""
+    global _listener
+    if _listener is None or not _listener.is_alive():
+        _listener = threading.Thread(target=_listen_forever, name='appointments-listener', daemon=True)
+        _listener.start()
@@ -0,0 +1,129 @@
+"""Manutenção das partições mensais de appointments.
+
+Uso:
+    python partitions.py create [--months-ahead N]
+    python partitions.py archive [--retention-months N] [--dir PASTA] [--keep]
+
+create   cria as partições do mês atual até N meses à frente
+archive  desanexa partições mais antigas que a retenção, exporta para
+         CSV compactado (gzip) e remove a tabela (exceto com --keep)
+
+Agende os dois comandos no cron (ex.: diariamente).
+"""
+import argparse
+import gzip
+import os
+import re
+from datetime import date
+from psycopg2 import sql
+from config import Config
+from db import get_db_connection, release_connection
+from dates import month_start
+
+PARTITION_RE = re.compile(r'^appointments_(\d{4})_(\d{2})$')
+
+def create_partitions(months_ahead=None):
+    """Garante partições do mês atual até months_ahead meses à frente"""
+    if months_ahead is None:
+        months_ahead = Config.APPOINTMENTS_MONTHS_AHEAD
+    today = date.today()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT create_appointment_partitions(%s, %s) as created',
+            (month_start(today), month_start(today, months_ahead))
+        )
+        created = cursor.fetchone()['created']
+        conn.commit()
+        return created
+    finally:
+        release_connection(conn)
+
+def list_partitions(cursor):
+    """Lista partições mensais (anexadas ou não) como [(nome, mês, anexada)]"""
+    cursor.execute(
+        '''
+        SELECT c.relname as name, i.inhparent IS NOT NULL as attached
+        FROM pg_class c
+        LEFT JOIN pg_inherits i ON i.inhrelid = c.oid
+        WHERE c.relkind = 'r' AND c.relname ~ '^appointments_[0-9]{4}_[0-9]{2}$'
+        ORDER BY c.relname
+        '''
+    )
+    partitions = []
+    for row in cursor.fetchall():
+        match = PARTITION_RE.match(row['name'])
+        if match:
+            month = date(int(match.group(1)), int(match.group(2)), 1)
+            partitions.append((row['name'], month, row['attached']))
+    return partitions
+
+def archive_partitions(retention_months=None, archive_dir=None, keep=False):
+    """Arquiva partições anteriores à retenção; retorna os arquivos gerados"""
+    if retention_months is None:
+        retention_months = Config.APPOINTMENTS_RETENTION_MONTHS
+    archive_dir = archive_dir or Config.APPOINTMENTS_ARCHIVE_DIR
+    cutoff = month_start(date.today(), -retention_months)
+    os.makedirs(archive_dir, exist_ok=True)
+
+    files = []
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        for name, month, attached in list_partitions(cursor):
+            if month >= cutoff:
+                continue
+            table = sql.Identifier(name)
+            path = os.path.join(archive_dir, f'{name}.csv.gz')
+
+            # Desanexa primeiro: consultas deixam de ver o mês antigo
+            if attached:
+                cursor.execute(sql.SQL('ALTER TABLE appointments DETACH PARTITION {}').format(table))
+                conn.commit()
+            elif os.path.exists(path):
+                # Já exportada em execução anterior
+                if not keep:
+                    cursor.execute(sql.SQL('DROP TABLE {}').format(table))
+                    conn.commit()
+                continue
+
+            tmp_path = path + '.tmp'
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                cursor.copy_expert(sql.SQL('COPY {} TO STDOUT WITH CSV HEADER').format(table), f)
+            os.replace(tmp_path, path)
+            files.append(path)
+
+            if not keep:
+                cursor.execute(sql.SQL('DROP TABLE {}').format(table))
+            conn.commit()
+            print(f"Partição {name} arquivada em {path}")
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        release_connection(conn)
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description='Partições mensais de appointments')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create = subparsers.add_parser('create', help='Cria partições futuras')
+    create.add_argument('--months-ahead', type=int, default=Config.APPOINTMENTS_MONTHS_AHEAD)
+
+    archive = subparsers.add_parser('archive', help='Arquiva partições antigas')
+    archive.add_argument('--retention-months', type=int, default=Config.APPOINTMENTS_RETENTION_MONTHS)
+    archive.add_argument('--dir', default=Config.APPOINTMENTS_ARCHIVE_DIR)
+    archive.add_argument('--keep', action='store_true', help='Apenas desanexa, sem remover a tabela')
+
+    args = parser.parse_args()
+    if args.command == 'create':
+        created = create_partitions(args.months_ahead)
+        print(f"{created} partição(ões) criada(s)")
+    else:
+        files = archive_partitions(args.retention_months, args.dir, args.keep)
+        print(f"{len(files)} partição(ões) arquivada(s)")
+
+if __name__ == '__main__':
+    main()
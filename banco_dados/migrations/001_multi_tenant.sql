@@ -0,0 +1,99 @@
+-- ====================================================================
+-- MIGRAÇÃO 001: MULTI-BARBEARIA
+-- ====================================================================
+-- Converte um banco de barbearia única para o schema multi-barbearia.
+-- Os dados existentes passam a pertencer à barbearia padrão (slug 'barbearia').
+--
+-- psql -h [HOST] -U barber_db -d barber_db < banco_dados/migrations/001_multi_tenant.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS shops (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    slug VARCHAR(100) UNIQUE NOT NULL,
+    evolution_instance VARCHAR(100) UNIQUE,
+    active BOOLEAN DEFAULT true,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO shops (name, slug, evolution_instance, active)
+VALUES ('Barbearia', 'barbearia', 'barbearia', true)
+ON CONFLICT (slug) DO NOTHING;
+
+-- Colunas shop_id (preenchidas com a barbearia padrão)
+ALTER TABLE users ADD COLUMN IF NOT EXISTS shop_id INTEGER REFERENCES shops(id);
+ALTER TABLE services ADD COLUMN IF NOT EXISTS shop_id INTEGER REFERENCES shops(id);
+ALTER TABLE barbers ADD COLUMN IF NOT EXISTS shop_id INTEGER REFERENCES shops(id);
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS shop_id INTEGER REFERENCES shops(id);
+ALTER TABLE whatsapp_sessions ADD COLUMN IF NOT EXISTS shop_id INTEGER REFERENCES shops(id);
+
+UPDATE users SET shop_id = (SELECT id FROM shops WHERE slug = 'barbearia')
+WHERE shop_id IS NULL AND role = 'client';
+UPDATE services SET shop_id = (SELECT id FROM shops WHERE slug = 'barbearia') WHERE shop_id IS NULL;
+UPDATE barbers SET shop_id = (SELECT id FROM shops WHERE slug = 'barbearia') WHERE shop_id IS NULL;
+UPDATE appointments SET shop_id = (SELECT id FROM shops WHERE slug = 'barbearia') WHERE shop_id IS NULL;
+UPDATE whatsapp_sessions SET shop_id = (SELECT id FROM shops WHERE slug = 'barbearia') WHERE shop_id IS NULL;
+
+ALTER TABLE services ALTER COLUMN shop_id SET NOT NULL;
+ALTER TABLE barbers ALTER COLUMN shop_id SET NOT NULL;
+ALTER TABLE appointments ALTER COLUMN shop_id SET NOT NULL;
+ALTER TABLE whatsapp_sessions ALTER COLUMN shop_id SET NOT NULL;
+
+-- Sessão WhatsApp passa a ser única por barbearia + telefone
+ALTER TABLE whatsapp_sessions DROP CONSTRAINT IF EXISTS whatsapp_sessions_phone_key;
+ALTER TABLE whatsapp_sessions ADD CONSTRAINT whatsapp_sessions_shop_id_phone_key UNIQUE (shop_id, phone);
+DROP INDEX IF EXISTS idx_whatsapp_sessions_phone;
+
+-- Índices começando por shop_id
+DROP INDEX IF EXISTS idx_services_active;
+DROP INDEX IF EXISTS idx_barbers_active;
+DROP INDEX IF EXISTS idx_appointments_user;
+DROP INDEX IF EXISTS idx_appointments_date;
+DROP INDEX IF EXISTS idx_appointments_status;
+
+CREATE INDEX IF NOT EXISTS idx_users_shop ON users(shop_id);
+CREATE INDEX IF NOT EXISTS idx_services_shop_active ON services(shop_id, active);
+CREATE INDEX IF NOT EXISTS idx_barbers_shop_active ON barbers(shop_id, active);
+CREATE INDEX IF NOT EXISTS idx_appointments_shop_user ON appointments(shop_id, user_id);
+CREATE INDEX IF NOT EXISTS idx_appointments_shop_date ON appointments(shop_id, date);
+CREATE INDEX IF NOT EXISTS idx_appointments_shop_status ON appointments(shop_id, status);
+
+-- Views com shop_id
+DROP VIEW IF EXISTS vw_appointments_full;
+CREATE VIEW vw_appointments_full AS
+SELECT
+    a.id,
+    a.shop_id,
+    a.date,
+    a.time,
+    a.status,
+    a.origin,
+    a.created_at,
+    u.name as client_name,
+    u.email as client_email,
+    u.phone as client_phone,
+    s.name as service_name,
+    s.price as service_price,
+    s.duration as service_duration,
+    b.name as barber_name
+FROM appointments a
+JOIN users u ON a.user_id = u.id
+JOIN services s ON a.service_id = s.id
+JOIN barbers b ON a.barber_id = b.id;
+
+DROP VIEW IF EXISTS vw_daily_metrics;
+CREATE VIEW vw_daily_metrics AS
+SELECT
+    a.shop_id,
+    date,
+    COUNT(*) as total_appointments,
+    COUNT(CASE WHEN status = 'confirmed' THEN 1 END) as confirmed,
+    COUNT(CASE WHEN status = 'cancelled' THEN 1 END) as cancelled,
+    SUM(CASE WHEN status = 'confirmed' THEN s.price ELSE 0 END) as revenue
+FROM appointments a
+JOIN services s ON a.service_id = s.id
+GROUP BY a.shop_id, date
+ORDER BY a.shop_id, date DESC;
+
+COMMIT;
@@ -0,0 +1,133 @@
+-- ====================================================================
+-- MIGRAÇÃO 002: APPOINTMENTS PARTICIONADA POR MÊS
+-- ====================================================================
+-- Converte appointments em tabela particionada por RANGE (date), com uma
+-- partição por mês (appointments_AAAA_MM). Requer a migração 001.
+-- Os ids são preservados e a sequência appointments_id_seq é reaproveitada.
+--
+-- psql -h [HOST] -U barber_db -d barber_db < banco_dados/migrations/002_partition_appointments.sql
+
+BEGIN;
+
+LOCK TABLE appointments IN ACCESS EXCLUSIVE MODE;
+
+-- Views dependem da tabela antiga; são recriadas no final
+DROP VIEW IF EXISTS vw_appointments_full;
+DROP VIEW IF EXISTS vw_daily_metrics;
+
+-- Tabela antiga sai do caminho, liberando nomes de constraints e índices
+ALTER TABLE appointments RENAME TO appointments_old;
+ALTER TABLE appointments_old DROP CONSTRAINT IF EXISTS appointments_pkey;
+ALTER TABLE appointments_old DROP CONSTRAINT IF EXISTS appointments_barber_id_date_time_key;
+DROP INDEX IF EXISTS idx_appointments_shop_user;
+DROP INDEX IF EXISTS idx_appointments_shop_date;
+DROP INDEX IF EXISTS idx_appointments_shop_status;
+DROP INDEX IF EXISTS idx_appointments_barber_date;
+
+CREATE TABLE appointments (
+    id INTEGER NOT NULL DEFAULT nextval('appointments_id_seq'),
+    shop_id INTEGER NOT NULL REFERENCES shops(id),
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    service_id INTEGER NOT NULL REFERENCES services(id),
+    barber_id INTEGER NOT NULL REFERENCES barbers(id),
+    date DATE NOT NULL,
+    time TIME NOT NULL,
+    status VARCHAR(20) DEFAULT 'confirmed' CHECK (status IN ('confirmed', 'cancelled', 'completed')),
+    origin VARCHAR(20) DEFAULT 'web' CHECK (origin IN ('web', 'whatsapp')),
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (id, date)
+) PARTITION BY RANGE (date);
+
+ALTER SEQUENCE appointments_id_seq OWNED BY appointments.id;
+
+CREATE TABLE appointments_default PARTITION OF appointments DEFAULT;
+
+CREATE UNIQUE INDEX uq_appointments_slot ON appointments(barber_id, date, time) WHERE status <> 'cancelled';
+CREATE INDEX idx_appointments_shop_user ON appointments(shop_id, user_id);
+CREATE INDEX idx_appointments_shop_date ON appointments(shop_id, date);
+CREATE INDEX idx_appointments_shop_date_active ON appointments(shop_id, date) WHERE status <> 'cancelled';
+CREATE INDEX idx_appointments_barber_date ON appointments(barber_id, date);
+
+CREATE OR REPLACE FUNCTION create_appointment_partitions(start_month DATE, end_month DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    part_month DATE := date_trunc('month', start_month)::date;
+    part_end DATE;
+    part_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE part_month <= end_month LOOP
+        part_name := 'appointments_' || to_char(part_month, 'YYYY_MM');
+        part_end := (part_month + INTERVAL '1 month')::date;
+        IF to_regclass(part_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE appointments INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                part_name
+            );
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM appointments_default WHERE date >= %L AND date < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                part_month, part_end, part_name
+            );
+            EXECUTE format(
+                'ALTER TABLE appointments ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                part_name, part_month, part_end
+            );
+            created := created + 1;
+        END IF;
+        part_month := part_end;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partições do mês mais antigo até 3 meses à frente
+SELECT create_appointment_partitions(
+    COALESCE((SELECT MIN(date) FROM appointments_old), CURRENT_DATE),
+    GREATEST(
+        COALESCE((SELECT MAX(date) FROM appointments_old), CURRENT_DATE),
+        (CURRENT_DATE + INTERVAL '3 months')::date
+    )
+);
+
+INSERT INTO appointments (id, shop_id, user_id, service_id, barber_id, date, time, status, origin, created_at)
+SELECT id, shop_id, user_id, service_id, barber_id, date, time, status, origin, created_at
+FROM appointments_old;
+
+DROP TABLE appointments_old;
+
+CREATE VIEW vw_appointments_full AS
+SELECT
+    a.id,
+    a.shop_id,
+    a.date,
+    a.time,
+    a.status,
+    a.origin,
+    a.created_at,
+    u.name as client_name,
+    u.email as client_email,
+    u.phone as client_phone,
+    s.name as service_name,
+    s.price as service_price,
+    s.duration as service_duration,
+    b.name as barber_name
+FROM appointments a
+JOIN users u ON a.user_id = u.id
+JOIN services s ON a.service_id = s.id
+JOIN barbers b ON a.barber_id = b.id;
+
+CREATE VIEW vw_daily_metrics AS
+SELECT
+    a.shop_id,
+    date,
+    COUNT(*) as total_appointments,
+    COUNT(CASE WHEN status = 'confirmed' THEN 1 END) as confirmed,
+    COUNT(CASE WHEN status = 'cancelled' THEN 1 END) as cancelled,
+    SUM(CASE WHEN status = 'confirmed' THEN s.price ELSE 0 END) as revenue
+FROM appointments a
+JOIN services s ON a.service_id = s.id
+GROUP BY a.shop_id, date
+ORDER BY a.shop_id, date DESC;
+
+COMMIT;
@@ -0,0 +1,85 @@
+-- ====================================================================
+-- MIGRAÇÃO 003: NOTIFY DE ALTERAÇÕES EM APPOINTMENTS
+-- ====================================================================
+-- Trigger que publica alterações no canal appointments_changes, consumido
+-- pelo feed SSE do painel admin. Redefine create_appointment_partitions para
+-- não publicar as linhas movidas da partição default. Requer a migração 002.
+--
+-- psql -h [HOST] -U barber_db -d barber_db < banco_dados/migrations/003_appointments_notify.sql
+
+BEGIN;
+
+-- Cria as partições mensais de start_month até end_month (inclusive)
+CREATE OR REPLACE FUNCTION create_appointment_partitions(start_month DATE, end_month DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    part_month DATE := date_trunc('month', start_month)::date;
+    part_end DATE;
+    part_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE part_month <= end_month LOOP
+        part_name := 'appointments_' || to_char(part_month, 'YYYY_MM');
+        part_end := (part_month + INTERVAL '1 month')::date;
+        IF to_regclass(part_name) IS NULL THEN
+            -- Move linhas do mês que caíram na partição default antes de anexar
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE appointments INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                part_name
+            );
+            -- Linhas só mudam de partição: o trigger de NOTIFY não deve publicar DELETE
+            PERFORM set_config('barbearia.skip_notify', 'on', true);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM appointments_default WHERE date >= %L AND date < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                part_month, part_end, part_name
+            );
+            PERFORM set_config('barbearia.skip_notify', 'off', true);
+            EXECUTE format(
+                'ALTER TABLE appointments ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                part_name, part_month, part_end
+            );
+            created := created + 1;
+        END IF;
+        part_month := part_end;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Publica cada alteração no canal appointments_changes (feed SSE do painel admin)
+CREATE OR REPLACE FUNCTION notify_appointment_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    rec RECORD;
+BEGIN
+    -- Movimentação interna entre partições (create_appointment_partitions)
+    IF current_setting('barbearia.skip_notify', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        rec := OLD;
+    ELSE
+        rec := NEW;
+    END IF;
+    PERFORM pg_notify('appointments_changes', json_build_object(
+        'op', TG_OP,
+        'id', rec.id,
+        'shop_id', rec.shop_id,
+        'date', rec.date,
+        'time', rec.time,
+        'status', rec.status,
+        'old_status', CASE WHEN TG_OP = 'UPDATE' THEN OLD.status END,
+        'origin', rec.origin,
+        'created_at', rec.created_at
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_appointments_notify ON appointments;
+CREATE TRIGGER trg_appointments_notify
+AFTER INSERT OR UPDATE OR DELETE ON appointments
+FOR EACH ROW EXECUTE FUNCTION notify_appointment_change();
+
+COMMIT;
@@ -5,9 +5,23 @@
 -- Extensões
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- ====================================================================
+-- TABELA: shops (barbearias / tenants)
+-- ====================================================================
+CREATE TABLE IF NOT EXISTS shops (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    slug VARCHAR(100) UNIQUE NOT NULL,
+    evolution_instance VARCHAR(100) UNIQUE, -- instância WhatsApp da barbearia
+    active BOOLEAN DEFAULT true,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
 -- ====================================================================
 -- TABELA: users
 -- ====================================================================
+-- Usuários são globais; shop_id é a barbearia de cadastro.
+-- Admin com shop_id nulo administra todas as barbearias.
 CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
@@ -15,18 +29,21 @@ CREATE TABLE IF NOT EXISTS users (
     password VARCHAR(255) NOT NULL,
     phone VARCHAR(20),
     role VARCHAR(20) DEFAULT 'client' CHECK (role IN ('admin', 'client')),
+    shop_id INTEGER REFERENCES shops(id),
     created_at TIMESTAMP DEFAULT NOW()
 );
 
 CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_users_role ON users(role);
 CREATE INDEX idx_users_phone ON users(phone);
+CREATE INDEX idx_users_shop ON users(shop_id);
 
 -- ====================================================================
 -- TABELA: services
 -- ====================================================================
 CREATE TABLE IF NOT EXISTS services (
     id SERIAL PRIMARY KEY,
+    shop_id INTEGER NOT NULL REFERENCES shops(id),
     name VARCHAR(255) NOT NULL,
     description TEXT,
     price DECIMAL(10, 2) NOT NULL,
@@ -34,25 +51,29 @@ CREATE TABLE IF NOT EXISTS services (
     active BOOLEAN DEFAULT true
 );
 
-CREATE INDEX idx_services_active ON services(active);
+CREATE INDEX idx_services_shop_active ON services(shop_id, active);
 
 -- ====================================================================
 -- TABELA: barbers
 -- ====================================================================
 CREATE TABLE IF NOT EXISTS barbers (
     id SERIAL PRIMARY KEY,
+    shop_id INTEGER NOT NULL REFERENCES shops(id),
     name VARCHAR(255) NOT NULL,
     phone VARCHAR(20),
     active BOOLEAN DEFAULT true
 );
 
-CREATE INDEX idx_barbers_active ON barbers(active);
+CREATE INDEX idx_barbers_shop_active ON barbers(shop_id, active);
 
 -- ====================================================================
--- TABELA: appointments
+-- TABELA: appointments (particionada por mês em date)
 -- ====================================================================
+-- Partições mensais appointments_AAAA_MM; as antigas são arquivadas com
+-- backend/partitions.py. PK e índices únicos precisam incluir date.
 CREATE TABLE IF NOT EXISTS appointments (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
+    shop_id INTEGER NOT NULL REFERENCES shops(id),
     user_id INTEGER NOT NULL REFERENCES users(id),
     service_id INTEGER NOT NULL REFERENCES services(id),
     barber_id INTEGER NOT NULL REFERENCES barbers(id),
@@ -61,14 +82,95 @@ CREATE TABLE IF NOT EXISTS appointments (
     status VARCHAR(20) DEFAULT 'confirmed' CHECK (status IN ('confirmed', 'cancelled', 'completed')),
     origin VARCHAR(20) DEFAULT 'web' CHECK (origin IN ('web', 'whatsapp')),
     created_at TIMESTAMP DEFAULT NOW(),
-    UNIQUE(barber_id, date, time)
-);
+    PRIMARY KEY (id, date)
+) PARTITION BY RANGE (date);
 
-CREATE INDEX idx_appointments_user ON appointments(user_id);
-CREATE INDEX idx_appointments_date ON appointments(date);
-CREATE INDEX idx_appointments_status ON appointments(status);
+-- Recebe datas fora das partições mensais (não deve acumular linhas)
+CREATE TABLE IF NOT EXISTS appointments_default PARTITION OF appointments DEFAULT;
+
+-- Um horário por barbeiro; cancelados liberam o horário e ficam fora do índice
+CREATE UNIQUE INDEX uq_appointments_slot ON appointments(barber_id, date, time) WHERE status <> 'cancelled';
+
+-- Índices começam por shop_id: o custo por barbearia não cresce com o número de barbearias
+CREATE INDEX idx_appointments_shop_user ON appointments(shop_id, user_id);
+CREATE INDEX idx_appointments_shop_date ON appointments(shop_id, date);
+CREATE INDEX idx_appointments_shop_date_active ON appointments(shop_id, date) WHERE status <> 'cancelled';
 CREATE INDEX idx_appointments_barber_date ON appointments(barber_id, date);
 
+-- Cria as partições mensais de start_month até end_month (inclusive)
+CREATE OR REPLACE FUNCTION create_appointment_partitions(start_month DATE, end_month DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    part_month DATE := date_trunc('month', start_month)::date;
+    part_end DATE;
+    part_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE part_month <= end_month LOOP
+        part_name := 'appointments_' || to_char(part_month, 'YYYY_MM');
+        part_end := (part_month + INTERVAL '1 month')::date;
+        IF to_regclass(part_name) IS NULL THEN
+            -- Move linhas do mês que caíram na partição default antes de anexar
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE appointments INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                part_name
+            );
+            -- Linhas só mudam de partição: o trigger de NOTIFY não deve publicar DELETE
+            PERFORM set_config('barbearia.skip_notify', 'on', true);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM appointments_default WHERE date >= %L AND date < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                part_month, part_end, part_name
+            );
+            PERFORM set_config('barbearia.skip_notify', 'off', true);
+            EXECUTE format(
+                'ALTER TABLE appointments ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                part_name, part_month, part_end
+            );
+            created := created + 1;
+        END IF;
+        part_month := part_end;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_appointment_partitions(CURRENT_DATE, (CURRENT_DATE + INTERVAL '3 months')::date);
+
+-- Publica cada alteração no canal appointments_changes (feed SSE do painel admin)
+CREATE OR REPLACE FUNCTION notify_appointment_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    rec RECORD;
+BEGIN
+    -- Movimentação interna entre partições (create_appointment_partitions)
+    IF current_setting('barbearia.skip_notify', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        rec := OLD;
+    ELSE
+        rec := NEW;
+    END IF;
+    PERFORM pg_notify('appointments_changes', json_build_object(
+        'op', TG_OP,
+        'id', rec.id,
+        'shop_id', rec.shop_id,
+        'date', rec.date,
+        'time', rec.time,
+        'status', rec.status,
+        'old_status', CASE WHEN TG_OP = 'UPDATE' THEN OLD.status END,
+        'origin', rec.origin,
+        'created_at', rec.created_at
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_appointments_notify
+AFTER INSERT OR UPDATE OR DELETE ON appointments
+FOR EACH ROW EXECUTE FUNCTION notify_appointment_change();
+
 -- ====================================================================
 -- TABELA: whatsapp_users
 -- ====================================================================
@@ -86,19 +188,24 @@ CREATE INDEX idx_whatsapp_users_phone ON whatsapp_users(phone);
 -- ====================================================================
 CREATE TABLE IF NOT EXISTS whatsapp_sessions (
     id SERIAL PRIMARY KEY,
-    phone VARCHAR(20) UNIQUE NOT NULL,
+    shop_id INTEGER NOT NULL REFERENCES shops(id),
+    phone VARCHAR(20) NOT NULL,
     step VARCHAR(50) NOT NULL,
     data JSONB,
     created_at TIMESTAMP DEFAULT NOW(),
-    updated_at TIMESTAMP DEFAULT NOW()
+    updated_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE(shop_id, phone)
 );
 
-CREATE INDEX idx_whatsapp_sessions_phone ON whatsapp_sessions(phone);
-
 -- ====================================================================
 -- DADOS INICIAIS
 -- ====================================================================
 
+-- Barbearia padrão
+INSERT INTO shops (name, slug, evolution_instance, active)
+VALUES ('Barbearia', 'barbearia', 'barbearia', true)
+ON CONFLICT (slug) DO NOTHING;
+
 -- Usuário admin padrão (senha: admin123)
 INSERT INTO users (name, email, password, role, created_at) 
 VALUES (
@@ -110,19 +217,27 @@ VALUES (
 ) ON CONFLICT (email) DO NOTHING;
 
 -- Serviços padrão
-INSERT INTO services (name, description, price, duration, active) VALUES
-('Corte Simples', 'Corte tradicional de cabelo', 30.00, 30, true),
-('Corte + Barba', 'Corte de cabelo e barba', 50.00, 45, true),
-('Barba', 'Apenas barba', 25.00, 20, true),
-('Corte Infantil', 'Corte para crianças até 12 anos', 25.00, 25, true),
-('Platinado', 'Descoloração completa', 150.00, 120, true)
+INSERT INTO services (shop_id, name, description, price, duration, active)
+SELECT s.id, v.name, v.description, v.price, v.duration, true
+FROM shops s, (VALUES
+    ('Corte Simples', 'Corte tradicional de cabelo', 30.00, 30),
+    ('Corte + Barba', 'Corte de cabelo e barba', 50.00, 45),
+    ('Barba', 'Apenas barba', 25.00, 20),
+    ('Corte Infantil', 'Corte para crianças até 12 anos', 25.00, 25),
+    ('Platinado', 'Descoloração completa', 150.00, 120)
+) AS v(name, description, price, duration)
+WHERE s.slug = 'barbearia'
 ON CONFLICT DO NOTHING;
 
 -- Barbeiros padrão
-INSERT INTO barbers (name, phone, active) VALUES
-('João Silva', '11999999999', true),
-('Pedro Santos', '11988888888', true),
-('Carlos Oliveira', '11977777777', true)
+INSERT INTO barbers (shop_id, name, phone, active)
+SELECT s.id, v.name, v.phone, true
+FROM shops s, (VALUES
+    ('João Silva', '11999999999'),
+    ('Pedro Santos', '11988888888'),
+    ('Carlos Oliveira', '11977777777')
+) AS v(name, phone)
+WHERE s.slug = 'barbearia'
 ON CONFLICT DO NOTHING;
 
 -- ====================================================================
@@ -133,6 +248,7 @@ ON CONFLICT DO NOTHING;
 CREATE OR REPLACE VIEW vw_appointments_full AS
 SELECT 
     a.id,
+    a.shop_id,
     a.date,
     a.time,
     a.status,
@@ -153,6 +269,7 @@ JOIN barbers b ON a.barber_id = b.id;
 -- View: Métricas diárias
 CREATE OR REPLACE VIEW vw_daily_metrics AS
 SELECT 
+    a.shop_id,
     date,
     COUNT(*) as total_appointments,
     COUNT(CASE WHEN status = 'confirmed' THEN 1 END) as confirmed,
@@ -160,5 +277,5 @@ SELECT
     SUM(CASE WHEN status = 'confirmed' THEN s.price ELSE 0 END) as revenue
 FROM appointments a
 JOIN services s ON a.service_id = s.id
-GROUP BY date
-ORDER BY date DESC;
+GROUP BY a.shop_id, date
+ORDER BY a.shop_id, date DESC;
@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react'
 import Navbar from '../../components/Navbar'
-import { getAdminAppointments } from '../../services/api'
+import { getAdminAppointments, subscribeAppointmentChanges, AppointmentChange } from '../../services/api'
 
 interface Appointment {
   id: number
@@ -19,9 +19,14 @@ function AdminAgendamentos() {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
   const [filter, setFilter] = useState('')
+  const [live, setLive] = useState(true)
   
   useEffect(() => {
     loadAppointments()
+    
+    // Alterações chegam pelo feed em tempo real, sem recarregar a lista
+    const source = subscribeAppointmentChanges(applyChange, loadAppointments, setLive)
+    return () => source.close()
   }, [])
   
   const loadAppointments = async () => {
@@ -35,6 +40,25 @@ function AdminAgendamentos() {
     }
   }
   
+  const applyChange = (change: AppointmentChange) => {
+    if (change.op === 'INSERT' && !change.client_name) {
+      loadAppointments()
+      return
+    }
+    
+    setAppointments((current) => {
+      if (change.op === 'DELETE') {
+        return current.filter((app) => app.id !== change.id)
+      }
+      if (current.some((app) => app.id === change.id)) {
+        return current.map((app) =>
+          app.id === change.id ? { ...app, status: change.status } : app
+        )
+      }
+      return [change as Appointment, ...current]
+    })
+  }
+  
   const formatDate = (date: string) => {
     return new Date(date + 'T00:00:00').toLocaleDateString('pt-BR')
   }
@@ -88,6 +112,10 @@ function AdminAgendamentos() {
         <div className="card">
           <h1 style={styles.title}>Gerenciar Agendamentos</h1>
           
+          {!live && (
+            <p style={styles.notice}>Tempo real indisponível: lista atualizada a cada 30 segundos.</p>
+          )}
+          
           <div style={styles.filterContainer}>
             <input
               type="text"
@@ -143,6 +171,10 @@ const styles: { [key: string]: React.CSSProperties } = {
     color: '#1f2937',
     marginBottom: '1.5rem'
   },
+  notice: {
+    color: '#b45309',
+    marginBottom: '1rem'
+  },
   filterContainer: {
     marginBottom: '1.5rem'
   },
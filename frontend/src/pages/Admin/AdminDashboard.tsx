@@ -1,6 +1,6 @@
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import Navbar from '../../components/Navbar'
-import { getMetrics } from '../../services/api'
+import { getMetrics, subscribeAppointmentChanges, AppointmentChange } from '../../services/api'
 
 interface Metrics {
   total_appointments: number
@@ -9,15 +9,85 @@ interface Metrics {
   top_services: Array<{ name: string; count: number }>
 }
 
+const todayString = () => {
+  const now = new Date()
+  const month = String(now.getMonth() + 1).padStart(2, '0')
+  const day = String(now.getDate()).padStart(2, '0')
+  return `${now.getFullYear()}-${month}-${day}`
+}
+
+// Aplica uma alteração às métricas; null quando só recarregando dá o valor exato
+const applyMetricsChange = (metrics: Metrics, change: AppointmentChange): Metrics | null => {
+  const oldStatus = change.op === 'INSERT' ? null : change.op === 'DELETE' ? change.status : change.old_status
+  const newStatus = change.op === 'DELETE' ? null : change.status
+  const isActive = (status: string | null) => status !== null && status !== 'cancelled'
+  
+  const activeDelta = Number(isActive(newStatus)) - Number(isActive(oldStatus))
+  const confirmedDelta = Number(newStatus === 'confirmed') - Number(oldStatus === 'confirmed')
+  const totalDelta = change.op === 'INSERT' ? 1 : change.op === 'DELETE' ? -1 : 0
+  
+  let topServices = metrics.top_services
+  if (activeDelta !== 0) {
+    const listed = topServices.some((service) => service.name === change.service_name)
+    // Fora de um ranking completo a contagem real é desconhecida
+    if (!change.service_name || (topServices.length >= 5 && (!listed || activeDelta < 0))) {
+      return null
+    }
+    topServices = listed
+      ? topServices.map((service) =>
+          service.name === change.service_name ? { ...service, count: service.count + activeDelta } : service
+        )
+      : [...topServices, { name: change.service_name, count: activeDelta }]
+    topServices = topServices
+      .filter((service) => service.count > 0)
+      .sort((a, b) => b.count - a.count)
+      .slice(0, 5)
+  }
+  
+  if (confirmedDelta !== 0 && change.price === undefined) {
+    return null
+  }
+  
+  return {
+    total_appointments: metrics.total_appointments + totalDelta,
+    today_appointments: metrics.today_appointments + (change.date === todayString() ? activeDelta : 0),
+    estimated_revenue: metrics.estimated_revenue + confirmedDelta * (change.price || 0),
+    top_services: topServices
+  }
+}
+
 function AdminDashboard() {
   const [metrics, setMetrics] = useState<Metrics | null>(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
+  const [live, setLive] = useState(true)
+  const metricsRef = useRef<Metrics | null>(null)
+  
+  useEffect(() => {
+    metricsRef.current = metrics
+  }, [metrics])
   
   useEffect(() => {
     loadMetrics()
+    
+    // Métricas acompanham o feed em tempo real (polling só com o feed fora)
+    const source = subscribeAppointmentChanges(applyChange, loadMetrics, setLive)
+    return () => source.close()
   }, [])
   
+  const applyChange = (change: AppointmentChange) => {
+    if (!metricsRef.current) {
+      return
+    }
+    const next = applyMetricsChange(metricsRef.current, change)
+    if (next) {
+      metricsRef.current = next
+      setMetrics(next)
+    } else {
+      loadMetrics()
+    }
+  }
+  
   const loadMetrics = async () => {
     try {
       const response = await getMetrics()
@@ -61,6 +131,10 @@ function AdminDashboard() {
       <div className="container">
         <h1 style={styles.title}>Dashboard Admin</h1>
         
+        {!live && (
+          <p style={styles.notice}>Tempo real indisponível: métricas atualizadas a cada 30 segundos.</p>
+        )}
+        
         <div style={styles.metrics}>
           <div className="card" style={styles.metricCard}>
             <div style={styles.metricIcon}>📊</div>
@@ -115,6 +189,10 @@ const styles: { [key: string]: React.CSSProperties } = {
     color: '#1f2937',
     marginBottom: '1.5rem'
   },
+  notice: {
+    color: '#b45309',
+    marginBottom: '1rem'
+  },
   metrics: {
     display: 'grid',
     gridTemplateColumns: 'repeat(auto-fit, minmax(250px, 1fr))',
@@ -1,6 +1,7 @@
 import axios from 'axios'
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:3000'
+const SHOP_ID = import.meta.env.VITE_SHOP_ID
 
 const api = axios.create({
   baseURL: API_URL,
@@ -16,6 +17,15 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`
     }
+    // Após agendar/cancelar, o backend pede leituras no primário até este prazo
+    const readAfter = localStorage.getItem('readAfter')
+    if (readAfter && Number(readAfter) * 1000 > Date.now()) {
+      config.headers['X-Read-After'] = readAfter
+    }
+    // Barbearia (multi-barbearia); sem valor o backend usa DEFAULT_SHOP_ID
+    if (SHOP_ID) {
+      config.headers['X-Shop-Id'] = SHOP_ID
+    }
     return config
   },
   (error) => {
@@ -25,7 +35,13 @@ api.interceptors.request.use(
 
 // Interceptor para tratar erros
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const readAfter = response.headers['x-read-after']
+    if (readAfter) {
+      localStorage.setItem('readAfter', readAfter)
+    }
+    return response
+  },
   (error) => {
     if (error.response?.status === 401) {
       localStorage.removeItem('token')
@@ -69,6 +85,106 @@ export const getAdminAppointments = () => api.get('/admin/appointments')
 
 export const getAdminUsers = () => api.get('/admin/users')
 
+// Feed em tempo real (SSE) das alterações de agendamentos (admin)
+export interface AppointmentChange {
+  op: 'INSERT' | 'UPDATE' | 'DELETE'
+  id: number
+  shop_id: number
+  date: string
+  time: string
+  status: string
+  old_status: string | null
+  origin: string
+  created_at: string
+  client_name?: string
+  client_phone?: string
+  service_name?: string
+  price?: number
+  barber_name?: string
+}
+
+// Sem feed (limite de streams do servidor atingido ou queda), a tela recarrega
+// periodicamente enquanto tenta reconectar com intervalo crescente
+const STREAM_POLL_MS = 30000
+const STREAM_RETRY_MS = 5000
+const STREAM_MAX_RETRY_MS = 60000
+
+export const subscribeAppointmentChanges = (
+  onChange: (change: AppointmentChange) => void,
+  onResync: () => void,
+  onLive?: (live: boolean) => void
+) => {
+  let source: EventSource | null = null
+  let retry: ReturnType<typeof setTimeout> | undefined
+  let polling: ReturnType<typeof setInterval> | undefined
+  let retryMs = STREAM_RETRY_MS
+  let closed = false
+  let opened = false
+  
+  const connect = async () => {
+    try {
+      // EventSource não envia headers: usa token curto, só do feed, na query string
+      const response = await api.post('/admin/appointments/stream-token')
+      if (closed) {
+        return
+      }
+      const params = new URLSearchParams({ jwt: response.data.token })
+      if (SHOP_ID) {
+        params.set('shop_id', SHOP_ID)
+      }
+      source = new EventSource(`${API_URL}/admin/appointments/stream?${params}`)
+    } catch {
+      fallback()
+      return
+    }
+    
+    source.onopen = () => {
+      retryMs = STREAM_RETRY_MS
+      if (polling) {
+        clearInterval(polling)
+        polling = undefined
+      }
+      onLive?.(true)
+      // Após reconexão, eventos podem ter sido perdidos
+      if (opened) {
+        onResync()
+      }
+      opened = true
+    }
+    source.addEventListener('appointment', (event) => {
+      onChange(JSON.parse((event as MessageEvent).data))
+    })
+    source.addEventListener('resync', () => onResync())
+    // Token expira logo e 503 não é repetido pelo navegador: reconecta com token novo
+    source.onerror = () => {
+      source?.close()
+      fallback()
+    }
+  }
+  
+  const fallback = () => {
+    if (closed) {
+      return
+    }
+    if (!polling) {
+      onLive?.(false)
+      polling = setInterval(onResync, STREAM_POLL_MS)
+    }
+    retry = setTimeout(connect, retryMs)
+    retryMs = Math.min(retryMs * 2, STREAM_MAX_RETRY_MS)
+  }
+  
+  connect()
+  return {
+    close: () => {
+      closed = true
+      clearTimeout(retry)
+      clearInterval(polling)
+      source?.close()
+    }
+  }
+}
+
 export const createService = (data: {
   name: string
   description: string